@@ -31,13 +31,16 @@ __all__ = ["Panda3DWorld"]
 class Panda3DWorld(ShowBase):
     """
     Panda3DWorld : A class to handle all panda3D world manipulation
+    triggered_copy : Only copy the rendered frame to screenTexture's RAM image when QPanda3DWidget
+                     is about to paint it. Leave it off if you read screenTexture yourself.
     """
 
     def __init__(self, width=800, height=600, is_fullscreen=False, size=1.0, clear_color=LVecBase4f(0.1, 0.1, 0.1, 1),
-                 name="qpanda3D"):
+                 name="qpanda3D", triggered_copy=False):
 
         sort = -100
         self.parent = None
+        self.triggered_copy = triggered_copy
         # self.width = width
         # self.height = height
 
@@ -71,7 +74,11 @@ class Panda3DWorld(ShowBase):
             GraphicsPipe.BF_resizeable,
             self.win.get_gsg(), self.win)
 
-        self.buff.addRenderTexture(self.screenTexture, GraphicsOutput.RTMCopyRam)
+        if triggered_copy:
+            # The frame is only copied to RAM when the widget asks for it, see QPanda3DSynchronizer
+            self.buff.addRenderTexture(self.screenTexture, GraphicsOutput.RTMTriggeredCopyRam)
+        else:
+            self.buff.addRenderTexture(self.screenTexture, GraphicsOutput.RTMCopyRam)
         self.buff.set_sort(sort)
         self.cam = self.makeCamera(self.buff)
         self.camNode = self.cam.node()
@@ -7,6 +7,9 @@ Description :
     It takes a Panda3DWorld object at init time.
     You should first create the Panda3DWorkd object before creating this widget.
 """
+import time
+from functools import lru_cache
+
 # PyQt imports
 from PyQt5 import QtWidgets, QtGui
 from PyQt5.QtCore import *
@@ -14,12 +17,12 @@ from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 
 # Panda imports
-from panda3d.core import Texture, WindowProperties, CallbackGraphicsWindow
+from panda3d.core import WindowProperties, CallbackGraphicsWindow
 from panda3d.core import loadPrcFileData
 
 from QPanda3D.QPanda3D_Buttons_Translation import QPanda3D_Button_translation
 from QPanda3D.QPanda3D_Keys_Translation import QPanda3D_Key_translation
-from QPanda3D.QPanda3D_Modifiers_Translation import QPanda3D_Modifier_translation
+from QPanda3D.QPanda3D_Modifiers_Translation import QPanda3D_Modifier_names_table, QPanda3D_Modifier_prefix_table
 
 __all__ = ["QPanda3DWidget"]
 
@@ -28,57 +31,98 @@ class QPanda3DSynchronizer(QTimer):
     def __init__(self, qPanda3DWidget, FPS=60):
         QTimer.__init__(self)
         self.qPanda3DWidget = qPanda3DWidget
-        dt = 1000 // FPS
-        self.setInterval(dt)
-        self.timeout.connect(self.tick)
+        self.frame_duration = 1 / FPS
+        self._running = False
+        self._deadline = 0
+        QTimer.setInterval(self, round(self.frame_duration * 1000))
+        # Each tick schedules the next one on a private single-shot timer, aiming at a fixed frame deadline
+        # instead of a fixed interval after however long the frame took. interval() stays the frame interval.
+        self._pacer = QTimer(self)
+        self._pacer.setSingleShot(True)
+        self._pacer.setTimerType(Qt.PreciseTimer)
+        self._pacer.timeout.connect(self.tick)
+
+    def setInterval(self, msec):
+        self.frame_duration = msec / 1000
+        QTimer.setInterval(self, msec)
+
+    def start(self, msec=None):
+        # Like QTimer.start(msec), an explicit interval becomes the new frame duration
+        if msec is not None:
+            self.setInterval(msec)
+        self._running = True
+        self._deadline = time.perf_counter() + self.frame_duration
+        self._pacer.start(round(self.frame_duration * 1000))
+
+    def stop(self):
+        self._running = False
+        self._pacer.stop()
+
+    def is_running(self):
+        return self._running
+
+    def isActive(self):
+        return self.is_running()
 
     def tick(self):
-        if self.isActive():
+        if self._running:
+            panda3DWorld = self.qPanda3DWidget.panda3DWorld
+            if panda3DWorld.triggered_copy and self.qPanda3DWidget.isVisible():
+                # Only read the frame back from the GPU when it is going to be painted
+                panda3DWorld.buff.triggerCopy()
+            self.qPanda3DWidget._send_pending_mouse_move()
             taskMgr.step()
             self.qPanda3DWidget.update()
 
+            # A Panda task may have stopped the synchronizer during the step
+            if self._running:
+                now = time.perf_counter()
+                self._deadline += self.frame_duration
+                if self._deadline < now:
+                    # Over budget: go back to the event loop right away and restart pacing from now
+                    self._deadline = now
+                self._pacer.start(int((self._deadline - now) * 1000))
+
     def __del__(self):
         self.stop()
 
 
 
 def get_panda_key_modifiers(evt):
-    panda_mods = []
-    qt_mods = evt.modifiers()
-    for qt_mod, panda_mod in QPanda3D_Modifier_translation.items():
-        if (qt_mods & qt_mod) == qt_mod:
-            panda_mods.append(panda_mod)
-    return panda_mods
+    return list(QPanda3D_Modifier_names_table[int(evt.modifiers())])
 
 
-def get_panda_key_modifiers_prefix(evt):
-        # join all modifiers (except NoModifier, which is None) with '-'
-    mods = [mod for mod in get_panda_key_modifiers(evt) if mod is not None]
-    prefix = "-".join(mods)
-
+def _modifiers_prefix(mods, key):
     # Fix the case where the modifier key is pressed
     # alone without other things
     # if not things like control-control would be possible
-    if isinstance(evt, QtGui.QMouseEvent):
-        key = QPanda3D_Button_translation[evt.button()]
-    elif isinstance(evt, QtGui.QKeyEvent):
-        key = QPanda3D_Key_translation[evt.key()]
-    elif isinstance(evt, QtGui.QWheelEvent):
-        key = "wheel"
-    else:
-        raise NotImplementedError("Unknown event type")
-
-    if key in mods:
-        mods.remove(key)
-        prefix = "-".join(mods)
-
-    # if the prefix is not empty, append a '-'
-    if prefix == "-":
-        prefix = ""
-    if prefix:
-        prefix += "-"
-
-    return prefix
+    if key in QPanda3D_Modifier_names_table[mods]:
+        # join all modifiers (except NoModifier, which is None) with '-'
+        names = [mod for mod in QPanda3D_Modifier_names_table[mods] if mod is not None]
+        names.remove(key)
+        prefix = "-".join(names)
+        return f"{prefix}-" if prefix else ""
+
+    return QPanda3D_Modifier_prefix_table[mods]
+
+
+@lru_cache(maxsize=1024)
+def _event_name(mods, key, suffix=""):
+    # The same few names are sent over and over (held keys, repeated clicks), build each one once
+    return f"{_modifiers_prefix(mods, key)}{key}{suffix}"
+
+
+def _mouse_event_name(evt, suffix=""):
+    return _event_name(int(evt.modifiers()), QPanda3D_Button_translation[evt.button()], suffix)
+
+
+def _key_event_name(evt, suffix=""):
+    return _event_name(int(evt.modifiers()), QPanda3D_Key_translation[evt.key()], suffix)
+
+
+def _wheel_event_name(evt):
+    return _event_name(int(evt.modifiers()), "wheel")
+
 
 class QPanda3DWidget(QWidget):
     """
@@ -107,9 +151,10 @@ class QPanda3DWidget(QWidget):
         # redrawTimer.start(1000/FPS)
 
         self.paintSurface = QPainter()
-        self.rotate = QTransform()
-        self.rotate.rotate(180)
         self.out_image = QImage()
+        self._out_image_modified = None
+        self._out_origin = QPoint(0, 0)
+        self._pending_move = None
 
         size = self.panda3DWorld.cam.node().get_lens().get_film_size()
         self.initial_film_size = QSizeF(size.x, size.y)
@@ -121,9 +166,10 @@ class QPanda3DWidget(QWidget):
         self.debug = debug
 
     def mousePressEvent(self, evt):
-        button = evt.button()
+        # Keep the pending move ordered before this event
+        self._send_pending_mouse_move()
         try:
-            b = f"{get_panda_key_modifiers_prefix(evt)}{QPanda3D_Button_translation[button]}"
+            b = _mouse_event_name(evt)
             if self.debug:
                 print(b)
             messenger.send(b,[{"x":evt.x(),"y":evt.y()}])
@@ -132,20 +178,31 @@ class QPanda3DWidget(QWidget):
             print(e)
 
     def mouseMoveEvent(self, evt:QtGui.QMouseEvent):
-        button = evt.button()
+        # Qt can deliver many moves per frame, only the last one is sent by the synchronizer
+        self._pending_move = (evt.x(), evt.y())
+        if not self.synchronizer.is_running():
+            # Nothing will flush it, send it right away
+            self._send_pending_mouse_move()
+
+    def _send_pending_mouse_move(self):
+        if self._pending_move is None:
+            return
+        x, y = self._pending_move
+        self._pending_move = None
         try:
             b = "mouse-move"
             if self.debug:
                 print(b)
-            messenger.send(b,[{"x":evt.x(),"y":evt.y()}])
+            messenger.send(b,[{"x":x,"y":y}])
         except Exception as e:
             print("Unimplemented button. Please send an issue on github to fix this problem")
             print(e)
 
     def mouseReleaseEvent(self, evt):
-        button = evt.button()
+        # Keep the pending move ordered before this event
+        self._send_pending_mouse_move()
         try:
-            b = f"{get_panda_key_modifiers_prefix(evt)}{QPanda3D_Button_translation[button]}-up"
+            b = _mouse_event_name(evt, "-up")
             if self.debug:
                 print(b)
             messenger.send(b,[{"x":evt.x(),"y":evt.y()}])
@@ -154,9 +211,11 @@ class QPanda3DWidget(QWidget):
             print(e)
 
     def wheelEvent(self, evt):
+        # Keep the pending move ordered before this event
+        self._send_pending_mouse_move()
         delta = evt.angleDelta().y()
         try:
-            w = f"{get_panda_key_modifiers_prefix(evt)}wheel"
+            w = _wheel_event_name(evt)
             if self.debug:
                 print(f"{w} {delta}")
             messenger.send(w, [{"delta": delta}])
@@ -165,9 +224,10 @@ class QPanda3DWidget(QWidget):
             print(e)
 
     def keyPressEvent(self, evt):
-        key = evt.key()
+        # Keep the pending move ordered before this event
+        self._send_pending_mouse_move()
         try:
-            k = f"{get_panda_key_modifiers_prefix(evt)}{QPanda3D_Key_translation[key]}"
+            k = _key_event_name(evt)
             if self.debug:
                 print(k)
             messenger.send(k)
@@ -176,9 +236,10 @@ class QPanda3DWidget(QWidget):
             print(e)
 
     def keyReleaseEvent(self, evt):
-        key = evt.key()
+        # Keep the pending move ordered before this event
+        self._send_pending_mouse_move()
         try:
-            k = f"{get_panda_key_modifiers_prefix(evt)}{QPanda3D_Key_translation[key]}-up"
+            k = _key_event_name(evt, "-up")
             if self.debug:
                 print(k)
             messenger.send(k)
@@ -192,17 +253,48 @@ class QPanda3DWidget(QWidget):
                            self.initial_film_size.height() * evt.size().height() / self.initial_size.height())
         self.panda3DWorld.buff.setSize(evt.size().width(), evt.size().height())
 
+    def _allocate_out_image(self, width, height):
+        self.out_image = QImage(width, height, QImage.Format_ARGB32)
+        # Touch every page once so that the per-frame copies do not pay for page faults
+        self.out_image.fill(0)
+        self._out_image_modified = None
+        # Panda's RAM image is stored bottom-up, copying its rows in reverse order
+        # flips it while filling the output image
+        stride = self.out_image.bytesPerLine()
+        size = height * stride
+        self._flip_rows = [(slice(size - start - stride, size - start), slice(start, start + stride))
+                           for start in range(0, size, stride)]
+
     def minimumSizeHint(self):
         return QSize(400, 300)
 
     # Use the paint event to pull the contents of the panda texture to the widget
     def paintEvent(self, event):
-        if self.panda3DWorld.screenTexture.mightHaveRamImage():
-            self.panda3DWorld.screenTexture.setFormat(Texture.FRgba32)
-            data = self.panda3DWorld.screenTexture.getRamImage().getData()
-            img = QImage(data, self.panda3DWorld.screenTexture.getXSize(), self.panda3DWorld.screenTexture.getYSize(),
-                         QImage.Format_ARGB32).mirrored()
+        texture = self.panda3DWorld.screenTexture
+        if texture.mightHaveRamImage():
+            width = texture.getXSize()
+            height = texture.getYSize()
+            if self.out_image.width() != width or self.out_image.height() != height:
+                # Follow the texture size, which only changes once Panda has rendered at the new widget size
+                self._allocate_out_image(width, height)
+            # The output image rows are in widget order, only the rows Qt asks to repaint are copied
+            rect = event.rect()
+            top = min(max(rect.top(), 0), height)
+            bottom = min(rect.bottom() + 1, height)
+            # Only copy frames that Panda has not already handed over, otherwise just redraw the last one
+            image_modified = texture.getImageModified()
+            if top < bottom and image_modified != self._out_image_modified:
+                ram_image = texture.getRamImage()
+                if len(ram_image) == self.out_image.sizeInBytes():
+                    # bits() is taken again for every frame so that Qt sees the image change (new cacheKey)
+                    bits = self.out_image.bits()
+                    bits.setsize(self.out_image.sizeInBytes())
+                    with memoryview(ram_image) as src, memoryview(bits) as dst:
+                        for dst_row, src_row in self._flip_rows[height - bottom:height - top]:
+                            dst[dst_row] = src[src_row]
+                    if top == 0 and bottom == height:
+                        self._out_image_modified = image_modified
             self.paintSurface.begin(self)
-            self.paintSurface.drawImage(0, 0, img)
+            self.paintSurface.drawImage(self._out_origin, self.out_image)
 
             self.paintSurface.end()
@@ -11,6 +11,7 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 import sys
+import itertools
 __all__ = ["QPanda3D_Modifiers_Translation"]
 
 QPanda3D_Modifier_translation ={
@@ -21,4 +22,24 @@ Qt.AltModifier:'alt',
 Qt.MetaModifier:'unknown',
 Qt.KeypadModifier:'unknown',
 Qt.GroupSwitchModifier:'unknown',
-}
\ No newline at end of file
+}
+
+
+def _build_modifier_tables():
+    names_table = {}
+    prefix_table = {}
+    qt_modifiers = [qt_mod for qt_mod in QPanda3D_Modifier_translation if qt_mod != Qt.NoModifier]
+    for count in range(len(qt_modifiers) + 1):
+        for combination in itertools.combinations(qt_modifiers, count):
+            mask = sum(int(qt_mod) for qt_mod in combination)
+            names = tuple(panda_mod for qt_mod, panda_mod in QPanda3D_Modifier_translation.items()
+                          if (mask & qt_mod) == qt_mod)
+            prefix = "-".join(mod for mod in names if mod is not None)
+            names_table[mask] = names
+            prefix_table[mask] = f"{prefix}-" if prefix else ""
+    return names_table, prefix_table
+
+
+# Panda modifier names and event prefix for every combination of the Qt modifiers above,
+# indexed by the integer value of QInputEvent.modifiers()
+QPanda3D_Modifier_names_table, QPanda3D_Modifier_prefix_table = _build_modifier_tables()